@@ -1,57 +1,46 @@
 import geopandas as gpd
 import pandas as pd
 
-# Load each transport layer and keep only point geometries
-metro = gpd.read_file("stcmetro_shp/STC_Metro_estaciones_utm14n.shp")
-metrobús = gpd.read_file("mb_shp/Metrobus_estaciones.shp")
-rtp = gpd.read_file("rtp_shp/RTP_paradas.shp")
-trolebus = gpd.read_file("ste_trolebus_shp/STE_Trolebus_Paradas.shp")
-tren_ligero = gpd.read_file("ste_tren_ligero_shp/STE_TrenLigero_estaciones_utm14n.shp")
-cablebus = gpd.read_file("ste_cablebus_shp/STE_Cablebus_estaciones.shp")
-
-# Filter to keep only point geometries
-metro = metro[metro.geometry.type == "Point"]
-metrobús = metrobús[metrobús.geometry.type == "Point"]
-rtp = rtp[rtp.geometry.type == "Point"]
-trolebus = trolebus[trolebus.geometry.type == "Point"]
-tren_ligero = tren_ligero[tren_ligero.geometry.type == "Point"]
-cablebus = cablebus[cablebus.geometry.type == "Point"]
-
-# Print number of points per mode
-print("Points per mode:")
-print("Metro:", len(metro))
-print("Metrobús:", len(metrobús))
-print("RTP:", len(rtp))
-print("Trolebús:", len(trolebus))
-print("Tren Ligero:", len(tren_ligero))
-print("Cablebús:", len(cablebus))
-
-# Set CRS for all layers
+try:
+    from shapely import get_type_id
+except ImportError:  # shapely < 2: per-geometry type check
+    get_type_id = None
+
+# Load each transport layer with its mode name
+layers = [
+    (gpd.read_file("stcmetro_shp/STC_Metro_estaciones_utm14n.shp", engine="pyogrio"), "Metro"),
+    (gpd.read_file("mb_shp/Metrobus_estaciones.shp", engine="pyogrio"), "Metrobus"),
+    (gpd.read_file("rtp_shp/RTP_paradas.shp", engine="pyogrio"), "RTP"),
+    (gpd.read_file("ste_trolebus_shp/STE_Trolebus_Paradas.shp", engine="pyogrio"), "Trolebús"),
+    (gpd.read_file("ste_tren_ligero_shp/STE_TrenLigero_estaciones_utm14n.shp", engine="pyogrio"), "TrenLigero"),
+    (gpd.read_file("ste_cablebus_shp/STE_Cablebus_estaciones.shp", engine="pyogrio"), "Cablebus"),
+]
+
+# Keep only point geometries (type id 0, checked in one bulk call per layer
+# with shapely 2), set CRS and add transport mode type column
 crs_target = "EPSG:4326"
-metro = metro.to_crs(crs_target)
-metrobús = metrobús.to_crs(crs_target)
-rtp = rtp.to_crs(crs_target)
-trolebus = trolebus.to_crs(crs_target)
-tren_ligero = tren_ligero.to_crs(crs_target)
-cablebus = cablebus.to_crs(crs_target)
-
-# Add transport mode type column
-metro["tipo"] = "Metro"
-metrobús["tipo"] = "Metrobus"
-rtp["tipo"] = "RTP"
-trolebus["tipo"] = "Trolebús"
-tren_ligero["tipo"] = "TrenLigero"
-cablebus["tipo"] = "Cablebus"
+print("Points per mode:")
+frames = []
+for gdf, name in layers:
+    if get_type_id is not None:
+        is_point = get_type_id(gdf.geometry.values) == 0
+    else:
+        is_point = gdf.geometry.type == "Point"
+    gdf = gdf[is_point].to_crs(crs_target)
+    gdf["tipo"] = name
+    print(f"{name}:", len(gdf))
+    frames.append(gdf)
 
 # Combine all transport layers into one GeoDataFrame
 transporte_publico = gpd.GeoDataFrame(
-    pd.concat([metro, metrobús, rtp, trolebus, tren_ligero, cablebus], ignore_index=True),
+    pd.concat(frames, ignore_index=True),
     crs=crs_target
 )
+transporte_publico["tipo"] = pd.Categorical(transporte_publico["tipo"], categories=[name for _, name in layers])
 
 # Print geometry type counts for verification
 print("\nFinal geometry types:")
 print(transporte_publico.geometry.type.value_counts())
 
-# Save combined transport stops to shapefile
-transporte_publico.to_file("transporte_union.shp")
\ No newline at end of file
+# Save combined transport stops to GeoParquet
+transporte_publico.to_parquet("transporte_union.parquet")